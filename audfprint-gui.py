@@ -1,19 +1,33 @@
-import io
 import os
 import signal
 import sys
+from itertools import repeat
 from loguru import logger
 
-from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QFont, QKeySequence
-from PyQt5.QtWidgets import (QApplication, QCheckBox, QComboBox, QDialog,
-                             QDoubleSpinBox, QFileDialog, QGridLayout,
+from PyQt5.QtCore import (QObject, QProcess, QStringListModel, Qt, QThread,
+                          QTimer, pyqtSignal, pyqtSlot)
+from PyQt5.QtGui import QFont, QKeySequence, QTextCursor
+from PyQt5.QtWidgets import (QAbstractItemView, QApplication, QCheckBox,
+                             QComboBox, QCompleter, QDialog, QDoubleSpinBox,
+                             QFileDialog, QFileSystemModel, QGridLayout,
                              QGroupBox, QHBoxLayout, QLabel, QLineEdit,
-                             QListWidget, QListWidgetItem, QPushButton,
+                             QListView, QListWidget, QListWidgetItem, QPushButton,
                              QScrollArea, QSpinBox, QStyle, QTextBrowser,
                              QVBoxLayout, QWidget, QShortcut, QMessageBox, QSlider)
 
-import audfprint
+# audfprint runs as a child process of this same program: a first
+# argument of RUN_AUDFPRINT_ARG makes main() run the audfprint CLI instead
+# of the GUI, both from source and in the frozen (Nuitka) build
+RUN_AUDFPRINT_ARG = "--run-audfprint"
+
+
+def audfprintCommand(args):
+    """ Return (program, arguments) that run the audfprint CLI with args """
+    if "__compiled__" in globals():
+        # Nuitka build: sys.executable is not a runnable program there,
+        # but argv[0] is the built executable itself
+        return os.path.abspath(sys.argv[0]), [RUN_AUDFPRINT_ARG] + args
+    return sys.executable, [os.path.abspath(__file__), RUN_AUDFPRINT_ARG] + args
 
 
 class CLIOutputBox(QGroupBox):
@@ -25,12 +39,40 @@ class CLIOutputBox(QGroupBox):
         layout = QVBoxLayout()
         self.outputTextBrowser = QTextBrowser()
         self.outputTextBrowser.setReadOnly(True)
+        # Cap memory use on long runs
+        self.outputTextBrowser.document().setMaximumBlockCount(5000)
         layout.addWidget(self.outputTextBrowser)
         self.setLayout(layout)
 
+        # Lines are buffered and written out together on a timer tick,
+        # so bursts of output cause one relayout instead of one per line
+        self._out_buffer = []
+        self._out_timer = QTimer(self)
+        self._out_timer.setSingleShot(True)
+        self._out_timer.setInterval(50)
+        self._out_timer.timeout.connect(self.flushText)
+
     def appendText(self, text, color="black"):
         colored_text = f'<span style="color:{color};">{text}</span>'
-        self.outputTextBrowser.append(colored_text)
+        self._out_buffer.append(colored_text)
+        if not self._out_timer.isActive():
+            self._out_timer.start()
+
+    def flushText(self):
+        if not self._out_buffer:
+            return
+        document = self.outputTextBrowser.document()
+        cursor = QTextCursor(document)
+        cursor.movePosition(QTextCursor.End)
+        cursor.beginEditBlock()
+        for colored_text in self._out_buffer:
+            if not document.isEmpty():
+                cursor.insertBlock()
+            cursor.insertHtml(colored_text)
+        cursor.endEditBlock()
+        self._out_buffer.clear()
+        scrollBar = self.outputTextBrowser.verticalScrollBar()
+        scrollBar.setValue(scrollBar.maximum())
 
     def info(self, text):
         self.appendText(text, color="blue")
@@ -45,19 +87,91 @@ class CLIOutputBox(QGroupBox):
         self.appendText(text, color="red")
 
     def clearText(self):
+        self._out_buffer.clear()
         self.outputTextBrowser.clear()
 
 
+class DirScanWorker(QObject):
+    """ Enumerates a directory off the GUI thread, emitting batches of paths """
+    batch_ready = pyqtSignal(list)
+    done = pyqtSignal()
+
+    BATCH_SIZE = 200
+
+    def __init__(self, dir_path, valid_suffixes, parent=None):
+        super().__init__(parent)
+        self.dir_path = dir_path
+        # Tuple of lowercased suffixes such as ".mp3", for str.endswith()
+        self.valid_suffixes = valid_suffixes
+
+    @pyqtSlot()
+    def run(self):
+        batch = []
+        try:
+            with os.scandir(self.dir_path) as it:
+                for entry in it:
+                    # Stop early if the window is closing
+                    if QThread.currentThread().isInterruptionRequested():
+                        break
+                    # DirEntry caches the file type from the directory read
+                    if entry.is_file(follow_symlinks=False) and \
+                            entry.name.lower().endswith(self.valid_suffixes):
+                        batch.append(entry.path)
+                        if len(batch) >= self.BATCH_SIZE:
+                            self.batch_ready.emit(batch)
+                            batch = []
+        except OSError as e:
+            logger.error(f"Failed to read directory {self.dir_path}: {e}")
+        finally:
+            if batch:
+                self.batch_ready.emit(batch)
+            self.done.emit()
+
+
 class AudfprintGUI(QWidget):
+    # Default parameter values; clicking a parameter's label restores it
+    _DEFAULTS = {
+        "density": 20,
+        "hashbits": 20,
+        "bucketsize": 100,
+        "maxtime": 16384,
+        "samplerate": 11025,
+        "shifts": 0,
+        "matchWin": 2,
+        "minCount": 5,
+        "maxMatches": 1,
+        "freqSd": 30.0,
+        "fanout": 3,
+        "pksPerFrame": 5,
+        "searchDepth": 100,
+        "ncores": 4,
+    }
+
     def __init__(self, parent=None):
         super().__init__(parent)
+        # Look up the standard icons once; some styles rasterize them per call
+        style = self.style()
+        self._icon_file = style.standardIcon(QStyle.SP_FileIcon)
+        self._icon_dir = style.standardIcon(QStyle.SP_DirIcon)
+        # Full paths are the source of truth, the list view only shows
+        # their truncated form
+        self._full_paths = []
+        self._max_depth = 0
+        # Start file dialogs where the user last picked something, so
+        # the (slow) listing of the home directory is not repeated
+        self._last_dir = os.path.expanduser("~")
+        # Thread of the directory scan in progress, if any
+        self._scanThread = None
         self.initUI()
         self.showMaximized()
         self.isExecuting = False
 
     def initUI(self):
         mainLayout = QHBoxLayout()
-        self.fileListView = QListWidget()
+        # A plain string model is far lighter than one QListWidgetItem per file
+        self.fileListModel = QStringListModel()
+        self.fileListView = QListView()
+        self.fileListView.setModel(self.fileListModel)
         self.maxPathDepthSlider = QSlider(Qt.Horizontal)
 
         quitShortcut = QShortcut(QKeySequence('Ctrl+Q'), self)
@@ -80,7 +194,7 @@ class AudfprintGUI(QWidget):
         fileDirButtonLayout = QHBoxLayout()
 
         self.addFileButton = QPushButton()
-        self.addFileButton.setIcon(self.style().standardIcon(QStyle.SP_FileIcon))
+        self.addFileButton.setIcon(self._icon_file)
         self.addFileButton.setStyleSheet(
             "QPushButton { background-color: white; color: black; }"
         )
@@ -88,7 +202,7 @@ class AudfprintGUI(QWidget):
         fileDirButtonLayout.addWidget(self.addFileButton)
 
         self.addDirButton = QPushButton()
-        self.addDirButton.setIcon(self.style().standardIcon(QStyle.SP_DirIcon))
+        self.addDirButton.setIcon(self._icon_dir)
         self.addDirButton.setStyleSheet(
             "QPushButton { background-color: white; color: black; }"
         )
@@ -126,6 +240,12 @@ class AudfprintGUI(QWidget):
         precompdirGroupBox = self.createPrecomputeDirGroupBox()
         centralLayout.addWidget(precompdirGroupBox)
 
+        # Autocomplete typed paths; QFileSystemModel reads directories on
+        # its own thread, so this never blocks the UI
+        pathCompleter = self.createPathCompleter()
+        self.dbaseLineEdit.setCompleter(pathCompleter)
+        self.precompdirLineEdit.setCompleter(pathCompleter)
+
         # Additional options
         optionsGroupBox = self.createOptionsGroupBox()
         centralLayout.addWidget(optionsGroupBox)
@@ -153,9 +273,14 @@ class AudfprintGUI(QWidget):
 
         self.updateUIBasedOnCommand()
         self.cmdCombo.currentIndexChanged.connect(self.updateUIBasedOnCommand)
-        self.fileListView.itemSelectionChanged.connect(lambda: self.maxPathDepthSlider.setMaximum(self.calculateMaxDepth()))
-        self.fileListView.itemChanged.connect(lambda: self.maxPathDepthSlider.setMaximum(self.calculateMaxDepth()))
-        self.maxPathDepthSlider.valueChanged.connect(self.updateFileList)
+        # Coalesce rapid slider moves into a single list rebuild
+        self._depth_timer = QTimer(self)
+        self._depth_timer.setSingleShot(True)
+        self._depth_timer.setInterval(50)
+        self._depth_timer.timeout.connect(lambda: self.updateFileList(self.maxPathDepthSlider.value()))
+        # start() restarts a pending timer; the lambda keeps the slider value
+        # from being taken as start(msec)
+        self.maxPathDepthSlider.valueChanged.connect(lambda value: self._depth_timer.start())
 
         self.setLayout(mainLayout)
         self.setWindowTitle("Audfprint GUI")
@@ -175,27 +300,33 @@ class AudfprintGUI(QWidget):
             options = QFileDialog.Options()
             options |= QFileDialog.DontConfirmOverwrite
             fname, _ = QFileDialog.getSaveFileName(
-                self, "Create New Database", os.path.expanduser("~"), "Database Files (*.db)", options=options
+                self, "Create New Database", self._last_dir, "Database Files (*.db)", options=options
             )
             if fname:
+                self._last_dir = os.path.dirname(fname)
                 self.dbaseLineEdit.setText(fname)
         elif "add - Add new files to an existing fingerprint database" in cmd:
             fname, _ = QFileDialog.getOpenFileName(
-                self, "Open Database File", os.path.expanduser("~"), "Database Files (*.db)"
+                self, "Open Database File", self._last_dir, "Database Files (*.db)"
             )
             if fname:
+                self._last_dir = os.path.dirname(fname)
                 self.dbaseLineEdit.setText(fname)
         else:
             fname, _ = QFileDialog.getOpenFileName(
-                self, "Open File", os.path.expanduser("~"), "All Files (*)"
+                self, "Open File", self._last_dir, "All Files (*)"
             )
             if fname:
+                self._last_dir = os.path.dirname(fname)
                 self.dbaseLineEdit.setText(fname)
 
     def createFileListGroupBox(self):
         fileListGroupBox = QGroupBox("File List")
         fileListLayout = QVBoxLayout()
 
+        self.fileListView.setUniformItemSizes(True)
+        self.fileListView.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.fileListView.setHorizontalScrollMode(QAbstractItemView.ScrollPerPixel)
         fileListLayout.addWidget(self.fileListView)
 
         # File type selection input that shows a modal dialog on click
@@ -204,6 +335,9 @@ class AudfprintGUI(QWidget):
         )
         self.fileTypeLineEdit.setReadOnly(True)
         self.fileTypeLineEdit.mousePressEvent = self.showFileTypeDialog
+        # Parse the filter once per edit rather than once per directory
+        self.fileTypeLineEdit.textChanged.connect(self._invalidate_exts)
+        self._invalidate_exts(self.fileTypeLineEdit.text())
         fileListLayout.addWidget(self.fileTypeLineEdit)
 
         fileListGroupBox.setLayout(fileListLayout)
@@ -264,18 +398,20 @@ class AudfprintGUI(QWidget):
         dialog.exec_()
 
     def updateFileList(self, depth):
-        self.fileListView.clear()
-        for i in range(self.fileListView.count()):
-            file_path = self.fileListView.item(i).text()
-            truncated_path = self.truncatePath(file_path, depth)
-            self.fileListView.addItem(truncated_path)
+        items = [self.truncatePath(file_path, depth) for file_path in self._full_paths]
+        # Rebuild in one go: a single model reset and relayout
+        self.fileListModel.setStringList(items)
 
     def truncatePath(self, path, depth):
-        parts = path.split(os.sep)
+        if depth < 1:
+            return path
+        # rsplit stops after depth splits, so only the kept components
+        # (plus the unsplit head) are allocated
+        parts = path.rsplit(os.sep, depth)
         if depth >= len(parts):
             return path
         else:
-            return os.sep.join(["..."] + parts[-depth:])
+            return os.sep.join(["..."] + parts[1:])
 
     def handleFileTypeSelection(self, listWidget):
         # Temporarily block signals to prevent recursion
@@ -307,40 +443,73 @@ class AudfprintGUI(QWidget):
 
     def addFile(self):
         fname, _ = QFileDialog.getOpenFileName(
-            self, "Select File", os.path.expanduser("~"), self.fileTypeLineEdit.text()
+            self, "Select File", self._last_dir, self.fileTypeLineEdit.text()
         )
         if fname:
-            self.fileListView.addItem(fname)
-            self.updateFileList(self.maxPathDepthSlider.value())
+            self._last_dir = os.path.dirname(fname)
+            self.addPaths([fname])
     
     def addDirectory(self):
         dir_path = QFileDialog.getExistingDirectory(
-            self, "Select Directory", os.path.expanduser("~")
+            self, "Select Directory", self._last_dir
         )
         if dir_path:
-            valid_extensions = self.extractExtensions(True)
+            self._last_dir = dir_path
             logger.info(f"Adding directory: {dir_path}")
-            logger.info(f"Valid extensions: {valid_extensions}")
-            for file_name in os.listdir(dir_path):
-                full_file_path = os.path.join(dir_path, file_name)
-                if os.path.isfile(full_file_path) and self.isValidExtension(file_name, valid_extensions):
-                    logger.info(f"Adding file: {full_file_path}")
-                    self.fileListView.addItem(full_file_path)
-            self.updateFileList(self.maxPathDepthSlider.value())
-
-    def extractExtensions(self, is_raw: bool = False):
+            logger.info(f"Valid extensions: {self.extractExtensions(True)}")
+
+            # Enumerate on a worker thread and add the files in batches
+            self._scanThread = QThread(self)
+            self._scanWorker = DirScanWorker(dir_path, self._cached_suffixes)
+            self._scanWorker.moveToThread(self._scanThread)
+            self._scanThread.started.connect(self._scanWorker.run)
+            self._scanWorker.batch_ready.connect(self.addPaths)
+            self._scanWorker.done.connect(self._scanThread.quit)
+            self._scanWorker.done.connect(self.onDirectoryScanned)
+            self._scanThread.finished.connect(self._scanWorker.deleteLater)
+            self._scanThread.finished.connect(self._scanThread.deleteLater)
+
+            self.addDirButton.setEnabled(False)
+            self._scanThread.start()
+
+    def onDirectoryScanned(self):
+        self._scanThread = None
+        self.addDirButton.setEnabled(True)
+
+    def stopDirectoryScan(self):
+        """ Interrupt a running directory scan and wait for its thread """
+        if self._scanThread is not None and self._scanThread.isRunning():
+            self._scanThread.requestInterruption()
+            self._scanThread.quit()
+            self._scanThread.wait()
+
+    def addPaths(self, paths):
+        for path in paths:
+            self._register_path(path)
+        depth = self.maxPathDepthSlider.value()
+        row = self.fileListModel.rowCount()
+        self.fileListModel.insertRows(row, len(paths))
+        for i, path in enumerate(paths):
+            self.fileListModel.setData(self.fileListModel.index(row + i),
+                                       self.truncatePath(path, depth))
+
+    def _invalidate_exts(self, fileTypeText):
         extensions = []
-        fileTypeText = self.fileTypeLineEdit.text()
         parts = fileTypeText.split(", ")
         for part in parts:
             ext = part.split(" ")[-1].strip("()")
             extensions.extend(ext.split(";"))
+        self._cached_exts = extensions
+        self._cached_raw_exts = [ext.removeprefix("*.") for ext in extensions]
+        self._cached_suffixes = self.extensionSuffixes(self._cached_raw_exts)
+
+    def extractExtensions(self, is_raw: bool = False):
         if is_raw:
-            extensions = [ext.removeprefix("*.") for ext in extensions]
-        return extensions
+            return list(self._cached_raw_exts)
+        return list(self._cached_exts)
 
-    def isValidExtension(self, file_name, valid_extensions):
-        return any(file_name.lower().endswith(f".{ext}") for ext in valid_extensions)
+    def extensionSuffixes(self, valid_extensions):
+        return tuple("." + ext.lower() for ext in valid_extensions)
 
     def createBackendGroupBox(self):
         backendGroupBox = QGroupBox("Processing backend")
@@ -389,56 +558,46 @@ class AudfprintGUI(QWidget):
 
         self.densityLabel = QLabel("Density:")
         self.densityLabel.setToolTip("Target hashes per second")
-        self.densityLabel.mousePressEvent = lambda event: self.densitySpinBox.setValue(
-            20
-        )
+        self.densityLabel.mousePressEvent = lambda event, key="density": self._reset(key)
         self.densitySpinBox = QSpinBox()
         self.densitySpinBox.setRange(1, 100)
-        self.densitySpinBox.setValue(20)
+        self.densitySpinBox.setValue(self._DEFAULTS["density"])
         paramLayout.addWidget(self.densityLabel, 0, 0)
         paramLayout.addWidget(self.densitySpinBox, 0, 1)
 
         self.hashbitsLabel = QLabel("Hash Bits:")
         self.hashbitsLabel.setToolTip("How many bits in each hash")
-        self.hashbitsLabel.mousePressEvent = (
-            lambda event: self.hashbitsSpinBox.setValue(20)
-        )
+        self.hashbitsLabel.mousePressEvent = lambda event, key="hashbits": self._reset(key)
         self.hashbitsSpinBox = QSpinBox()
         self.hashbitsSpinBox.setRange(1, 32)
-        self.hashbitsSpinBox.setValue(20)
+        self.hashbitsSpinBox.setValue(self._DEFAULTS["hashbits"])
         paramLayout.addWidget(self.hashbitsLabel, 1, 0)
         paramLayout.addWidget(self.hashbitsSpinBox, 1, 1)
 
         self.bucketsizeLabel = QLabel("Bucket Size:")
         self.bucketsizeLabel.setToolTip("Number of entries per bucket")
-        self.bucketsizeLabel.mousePressEvent = (
-            lambda event: self.bucketsizeSpinBox.setValue(100)
-        )
+        self.bucketsizeLabel.mousePressEvent = lambda event, key="bucketsize": self._reset(key)
         self.bucketsizeSpinBox = QSpinBox()
         self.bucketsizeSpinBox.setRange(1, 1000)
-        self.bucketsizeSpinBox.setValue(100)
+        self.bucketsizeSpinBox.setValue(self._DEFAULTS["bucketsize"])
         paramLayout.addWidget(self.bucketsizeLabel, 2, 0)
         paramLayout.addWidget(self.bucketsizeSpinBox, 2, 1)
 
         self.maxtimeLabel = QLabel("Max Time:")
         self.maxtimeLabel.setToolTip("Largest time value stored")
-        self.maxtimeLabel.mousePressEvent = lambda event: self.maxtimeSpinBox.setValue(
-            16384
-        )
+        self.maxtimeLabel.mousePressEvent = lambda event, key="maxtime": self._reset(key)
         self.maxtimeSpinBox = QSpinBox()
         self.maxtimeSpinBox.setRange(1, 65536)
-        self.maxtimeSpinBox.setValue(16384)
+        self.maxtimeSpinBox.setValue(self._DEFAULTS["maxtime"])
         paramLayout.addWidget(self.maxtimeLabel, 3, 0)
         paramLayout.addWidget(self.maxtimeSpinBox, 3, 1)
 
         self.samplerateLabel = QLabel("Sample Rate:")
         self.samplerateLabel.setToolTip("Resample input files to this rate")
-        self.samplerateLabel.mousePressEvent = (
-            lambda event: self.samplerateSpinBox.setValue(11025)
-        )
+        self.samplerateLabel.mousePressEvent = lambda event, key="samplerate": self._reset(key)
         self.samplerateSpinBox = QSpinBox()
         self.samplerateSpinBox.setRange(8000, 48000)
-        self.samplerateSpinBox.setValue(11025)
+        self.samplerateSpinBox.setValue(self._DEFAULTS["samplerate"])
         paramLayout.addWidget(self.samplerateLabel, 4, 0)
         paramLayout.addWidget(self.samplerateSpinBox, 4, 1)
 
@@ -456,6 +615,13 @@ class AudfprintGUI(QWidget):
         precompdirGroupBox.setLayout(precompdirLayout)
         return precompdirGroupBox
 
+    def createPathCompleter(self):
+        fileSystemModel = QFileSystemModel(self)
+        fileSystemModel.setRootPath("")
+        pathCompleter = QCompleter(fileSystemModel, self)
+        pathCompleter.setCaseSensitivity(Qt.CaseInsensitive)
+        return pathCompleter
+
     def createOptionsGroupBox(self):
         optionsGroupBox = QGroupBox("Options")
         optionsLayout = QVBoxLayout()
@@ -485,10 +651,10 @@ class AudfprintGUI(QWidget):
         self.shiftsLabel.setToolTip(
             "Use this many subframe shifts building fingerprint"
         )
-        self.shiftsLabel.mousePressEvent = lambda event: self.shiftsSpinBox.setValue(0)
+        self.shiftsLabel.mousePressEvent = lambda event, key="shifts": self._reset(key)
         self.shiftsSpinBox = QSpinBox()
         self.shiftsSpinBox.setRange(0, 10)
-        self.shiftsSpinBox.setValue(0)
+        self.shiftsSpinBox.setValue(self._DEFAULTS["shifts"])
         miscLayout.addWidget(self.shiftsLabel, 0, 0)
         miscLayout.addWidget(self.shiftsSpinBox, 0, 1)
 
@@ -496,12 +662,10 @@ class AudfprintGUI(QWidget):
         self.matchWinLabel.setToolTip(
             "Maximum tolerable frame skew to count as a match"
         )
-        self.matchWinLabel.mousePressEvent = (
-            lambda event: self.matchWinSpinBox.setValue(2)
-        )
+        self.matchWinLabel.mousePressEvent = lambda event, key="matchWin": self._reset(key)
         self.matchWinSpinBox = QSpinBox()
         self.matchWinSpinBox.setRange(1, 10)
-        self.matchWinSpinBox.setValue(2)
+        self.matchWinSpinBox.setValue(self._DEFAULTS["matchWin"])
         miscLayout.addWidget(self.matchWinLabel, 1, 0)
         miscLayout.addWidget(self.matchWinSpinBox, 1, 1)
 
@@ -509,12 +673,10 @@ class AudfprintGUI(QWidget):
         self.minCountLabel.setToolTip(
             "Minimum number of matching landmarks to count as a match"
         )
-        self.minCountLabel.mousePressEvent = (
-            lambda event: self.minCountSpinBox.setValue(5)
-        )
+        self.minCountLabel.mousePressEvent = lambda event, key="minCount": self._reset(key)
         self.minCountSpinBox = QSpinBox()
         self.minCountSpinBox.setRange(1, 100)
-        self.minCountSpinBox.setValue(5)
+        self.minCountSpinBox.setValue(self._DEFAULTS["minCount"])
         miscLayout.addWidget(self.minCountLabel, 2, 0)
         miscLayout.addWidget(self.minCountSpinBox, 2, 1)
 
@@ -522,43 +684,37 @@ class AudfprintGUI(QWidget):
         self.maxMatchesLabel.setToolTip(
             "Maximum number of matches to report for each query"
         )
-        self.maxMatchesLabel.mousePressEvent = (
-            lambda event: self.maxMatchesSpinBox.setValue(1)
-        )
+        self.maxMatchesLabel.mousePressEvent = lambda event, key="maxMatches": self._reset(key)
         self.maxMatchesSpinBox = QSpinBox()
         self.maxMatchesSpinBox.setRange(1, 100)
-        self.maxMatchesSpinBox.setValue(1)
+        self.maxMatchesSpinBox.setValue(self._DEFAULTS["maxMatches"])
         miscLayout.addWidget(self.maxMatchesLabel, 3, 0)
         miscLayout.addWidget(self.maxMatchesSpinBox, 3, 1)
 
         self.freqSdLabel = QLabel("Frequency SD:")
         self.freqSdLabel.setToolTip("Frequency peak spreading SD in bins")
-        self.freqSdLabel.mousePressEvent = lambda event: self.freqSdSpinBox.setValue(
-            30.0
-        )
+        self.freqSdLabel.mousePressEvent = lambda event, key="freqSd": self._reset(key)
         self.freqSdSpinBox = QDoubleSpinBox()
         self.freqSdSpinBox.setRange(0.0, 100.0)
-        self.freqSdSpinBox.setValue(30.0)
+        self.freqSdSpinBox.setValue(self._DEFAULTS["freqSd"])
         miscLayout.addWidget(self.freqSdLabel, 4, 0)
         miscLayout.addWidget(self.freqSdSpinBox, 4, 1)
 
         self.fanoutLabel = QLabel("Fanout:")
         self.fanoutLabel.setToolTip("Max number of hash pairs per peak")
-        self.fanoutLabel.mousePressEvent = lambda event: self.fanoutSpinBox.setValue(3)
+        self.fanoutLabel.mousePressEvent = lambda event, key="fanout": self._reset(key)
         self.fanoutSpinBox = QSpinBox()
         self.fanoutSpinBox.setRange(1, 10)
-        self.fanoutSpinBox.setValue(3)
+        self.fanoutSpinBox.setValue(self._DEFAULTS["fanout"])
         miscLayout.addWidget(self.fanoutLabel, 5, 0)
         miscLayout.addWidget(self.fanoutSpinBox, 5, 1)
 
         self.pksPerFrameLabel = QLabel("Peaks Per Frame:")
         self.pksPerFrameLabel.setToolTip("Maximum number of peaks per frame")
-        self.pksPerFrameLabel.mousePressEvent = (
-            lambda event: self.pksPerFrameSpinBox.setValue(5)
-        )
+        self.pksPerFrameLabel.mousePressEvent = lambda event, key="pksPerFrame": self._reset(key)
         self.pksPerFrameSpinBox = QSpinBox()
         self.pksPerFrameSpinBox.setRange(1, 10)
-        self.pksPerFrameSpinBox.setValue(5)
+        self.pksPerFrameSpinBox.setValue(self._DEFAULTS["pksPerFrame"])
         miscLayout.addWidget(self.pksPerFrameLabel, 6, 0)
         miscLayout.addWidget(self.pksPerFrameSpinBox, 6, 1)
 
@@ -566,35 +722,35 @@ class AudfprintGUI(QWidget):
         self.searchDepthLabel.setToolTip(
             "How far down to search raw matching track list"
         )
-        self.searchDepthLabel.mousePressEvent = (
-            lambda event: self.searchDepthSpinBox.setValue(100)
-        )
+        self.searchDepthLabel.mousePressEvent = lambda event, key="searchDepth": self._reset(key)
         self.searchDepthSpinBox = QSpinBox()
         self.searchDepthSpinBox.setRange(1, 1000)
-        self.searchDepthSpinBox.setValue(100)
+        self.searchDepthSpinBox.setValue(self._DEFAULTS["searchDepth"])
         miscLayout.addWidget(self.searchDepthLabel, 7, 0)
         miscLayout.addWidget(self.searchDepthSpinBox, 7, 1)
 
         self.ncoresLabel = QLabel("Number of Cores:")
         self.ncoresLabel.setToolTip("Number of processor cores to use")
-        self.ncoresLabel.mousePressEvent = (
-            lambda event: self.ncoresSpinBox.setValue(4)
-        )
+        self.ncoresLabel.mousePressEvent = lambda event, key="ncores": self._reset(key)
         self.ncoresSpinBox = QSpinBox()
         self.ncoresSpinBox.setRange(1, 16)
-        self.ncoresSpinBox.setValue(4)
+        self.ncoresSpinBox.setValue(self._DEFAULTS["ncores"])
         miscLayout.addWidget(self.ncoresLabel, 8, 0)
         miscLayout.addWidget(self.ncoresSpinBox, 8, 1)
 
         miscGroupBox.setLayout(miscLayout)
         return miscGroupBox
 
+    def _reset(self, key):
+        getattr(self, key + "SpinBox").setValue(self._DEFAULTS[key])
+
     def createMaxPathDepthSlider(self):
         maxPathDepthSliderGroupBox = QGroupBox("Max Path Depth")
         layout = QVBoxLayout()
 
         self.maxPathDepthSlider.setMinimum(1)
-        self.maxPathDepthSlider.setMaximum(self.calculateMaxDepth())
+        # Never below the minimum, or Qt collapses the range to 0
+        self.maxPathDepthSlider.setMaximum(max(1, self.calculateMaxDepth()))
         self.maxPathDepthSlider.setValue(1)  # Default value
         self.maxPathDepthSlider.setTickPosition(QSlider.TicksBelow)
         self.maxPathDepthSlider.setTickInterval(1)
@@ -610,103 +766,139 @@ class AudfprintGUI(QWidget):
         maxPathDepthSliderGroupBox.setLayout(layout)
         return maxPathDepthSliderGroupBox
 
+    def _register_path(self, path):
+        """ Record a new full path, growing the depth slider range if needed """
+        self._full_paths.append(path)
+        depth = path.count(os.sep)
+        if depth > self._max_depth:
+            self._max_depth = depth
+            self.maxPathDepthSlider.setMaximum(self._max_depth)
+
     def calculateMaxDepth(self):
-        max_depth = 0
-        for i in range(self.fileListView.count()):
-            file_path = self.fileListView.item(i).text()
-            depth = file_path.count(os.sep)
-            if depth > max_depth:
-                max_depth = depth
-        return max_depth
+        # Full rescan, only needed when the incremental maximum is stale;
+        # map() with a C callable avoids a Python frame per path
+        return max(map(str.count, self._full_paths, repeat(os.sep)), default=0)
 
     def browseDirectory(self):
         dir_path = QFileDialog.getExistingDirectory(
-            self, "Select Directory", os.path.expanduser("~")
+            self, "Select Directory", self._last_dir
         )
         if dir_path:
+            self._last_dir = dir_path
             self.precompdirLineEdit.setText(dir_path)
 
     def runAudfprint(self):
-        self.isExecuting = True
-        try:
-            cmd = self.cmdCombo.currentText()
-            dbase = self.dbaseLineEdit.text().strip()
-            if not dbase:
-                self.cliOutputBox.error("Error: Database path is required.")
-                return
-
-            self.cliOutputBox.clearText()
-
-            # Collect all the inputs
-            cmd = self.cmdCombo.currentText()
-            dbase = self.dbaseLineEdit.text()
-            density = self.densitySpinBox.value()
-            hashbits = self.hashbitsSpinBox.value()
-            bucketsize = self.bucketsizeSpinBox.value()
-            maxtime = self.maxtimeSpinBox.value()
-            samplerate = self.samplerateSpinBox.value()
-            precompdir = self.precompdirLineEdit.text()
-            skip_existing = self.skipExistingCheckBox.isChecked()
-            continue_on_error = self.continueOnErrorCheckBox.isChecked()
-            list_files = self.listCheckBox.isChecked()
-            sort_by_time = self.sortByTimeCheckBox.isChecked()
-            ncores = self.ncoresSpinBox.value()
-
-            # Collect all file paths from the fileListView
-            file_paths = [self.fileListView.item(i).text() for i in range(self.fileListView.count())]
-
-            # Construct the command line argument
-            args = [
-                "--cmd", cmd,
-                "--dbase", dbase,
-                "--density", str(density),
-                "--bucketsize", str(bucketsize),
-                "--maxtime", str(maxtime),
-                "--samplerate", str(samplerate),
-                "--precompdir", precompdir,
-                "--skip-existing", str(skip_existing),
-                "--continue-on-error", str(continue_on_error),
-                "--list", str(list_files),
-                "--sort-by-time", str(sort_by_time),
-                "--ncores", str(ncores)  # Add number of cores to arguments
-            ] + file_paths  # Add file paths to arguments
-
-            # Call the audfprint main function or subprocess with these arguments
-            print("Arguments to pass:", args)
-            # You would call audfprint.main(args) if it's properly refactored to accept args
-
-            # Example usage of CLIOutputBox
-            self.cliOutputBox.debug("Running audfprint with the following arguments:")
-            self.cliOutputBox.debug(str(args))
-
-            old_stdout, old_stderr = self.patchStdout()
-            try:
-                audfprint.main(args)
-            finally:
-                self.restoreStdout(old_stdout, old_stderr)
-        finally:
-            self.isExecuting = False
-
-    def patchStdout(self):
-        class StdoutOutputInterceptor(io.StringIO):
-            def write(self, s):
-                super().write(s)
-                self.cliOutputBox.info(s)
-
-        class StderrOutputInterceptor(io.StringIO):
-            def write(self, s):
-                super().write(s)
-                self.cliOutputBox.error(s)
+        if self.isExecuting:
+            return
+        cmd = self.cmdCombo.currentText()
+        dbase = self.dbaseLineEdit.text().strip()
+        if not dbase:
+            self.cliOutputBox.error("Error: Database path is required.")
+            return
+
+        self.cliOutputBox.clearText()
+
+        # Collect all the inputs; the combo text is "<cmd> - <description>"
+        cmd = self.cmdCombo.currentText().split()[0]
+        dbase = self.dbaseLineEdit.text()
+        density = self.densitySpinBox.value()
+        hashbits = self.hashbitsSpinBox.value()
+        bucketsize = self.bucketsizeSpinBox.value()
+        maxtime = self.maxtimeSpinBox.value()
+        samplerate = self.samplerateSpinBox.value()
+        precompdir = self.precompdirLineEdit.text()
+        skip_existing = self.skipExistingCheckBox.isChecked()
+        continue_on_error = self.continueOnErrorCheckBox.isChecked()
+        list_files = self.listCheckBox.isChecked()
+        sort_by_time = self.sortByTimeCheckBox.isChecked()
+        ncores = self.ncoresSpinBox.value()
+
+        # Collect all the (untruncated) file paths
+        file_paths = list(self._full_paths)
+
+        # Construct the command line, matching audfprint.main: cmd is
+        # positional and the boolean options are flags
+        args = [
+            cmd,
+            "--dbase", dbase,
+            "--density", str(density),
+            "--hashbits", str(hashbits),
+            "--bucketsize", str(bucketsize),
+            "--maxtime", str(maxtime),
+            "--samplerate", str(samplerate),
+            "--precompdir", precompdir,
+            "--ncores", str(ncores)  # Add number of cores to arguments
+        ]
+        for flag, checked in (("--skip-existing", skip_existing),
+                              ("--continue-on-error", continue_on_error),
+                              ("--list", list_files),
+                              ("--sortbytime", sort_by_time)):
+            if checked:
+                args.append(flag)
+        args += file_paths  # Add file paths to arguments
+
+        # Example usage of CLIOutputBox
+        self.cliOutputBox.debug("Running audfprint with the following arguments:")
+        self.cliOutputBox.debug(str(args))
+
+        # Run audfprint in a child process: the GUI keeps its own GIL and
+        # event loop, and the job can be killed cleanly
+        program, arguments = audfprintCommand(args)
+        self._proc = QProcess(self)
+        self._proc.setProgram(program)
+        self._proc.setArguments(arguments)
+        self._procPartial = {QProcess.StandardOutput: "", QProcess.StandardError: ""}
+        self._proc.readyReadStandardOutput.connect(self.onProcessStdout)
+        self._proc.readyReadStandardError.connect(self.onProcessStderr)
+        self._proc.finished.connect(self.onAudfprintFinished)
+        self._proc.errorOccurred.connect(self.onProcessError)
 
-        old_stdout = sys.stdout
-        old_stderr = sys.stderr
-        sys.stdout = StdoutOutputInterceptor()
-        sys.stderr = StderrOutputInterceptor()
-        return old_stdout, old_stderr
+        self.isExecuting = True
+        self.runButton.setEnabled(False)
+        self._proc.start()
+
+    def processLines(self, channel, data):
+        """ Split newly read output into complete lines, holding back
+            any trailing partial line until the next read """
+        text = self._procPartial[channel] + bytes(data).decode("utf-8", "replace")
+        lines = text.split("\n")
+        self._procPartial[channel] = lines.pop()
+        return [line.rstrip() for line in lines if line.strip()]
+
+    def onProcessStdout(self):
+        data = self._proc.readAllStandardOutput()
+        for line in self.processLines(QProcess.StandardOutput, data):
+            self.cliOutputBox.info(line)
+
+    def onProcessStderr(self):
+        data = self._proc.readAllStandardError()
+        for line in self.processLines(QProcess.StandardError, data):
+            self.cliOutputBox.error(line)
+
+    def onAudfprintFinished(self, exitCode, exitStatus):
+        # Flush anything left without a trailing newline
+        self.onProcessStdout()
+        self.onProcessStderr()
+        for channel, report in ((QProcess.StandardOutput, self.cliOutputBox.info),
+                                (QProcess.StandardError, self.cliOutputBox.error)):
+            if self._procPartial[channel].strip():
+                report(self._procPartial[channel].rstrip())
+            self._procPartial[channel] = ""
+        if exitStatus == QProcess.CrashExit:
+            self.cliOutputBox.error("audfprint was terminated.")
+        elif exitCode != 0:
+            self.cliOutputBox.error(f"audfprint exited with code {exitCode}.")
+        self.runButton.setEnabled(True)
+        self.isExecuting = False
+        self._proc.deleteLater()
 
-    def restoreStdout(self, old_stdout, old_stderr):
-        sys.stdout = old_stdout
-        sys.stderr = old_stderr
+    def onProcessError(self, error):
+        # A process that never started will not emit finished
+        if error == QProcess.FailedToStart:
+            self.cliOutputBox.error(f"Failed to start audfprint: {self._proc.errorString()}")
+            self.runButton.setEnabled(True)
+            self.isExecuting = False
+            self._proc.deleteLater()
 
     def closeEvent(self, event):
         if self.isExecuting:
@@ -714,13 +906,25 @@ class AudfprintGUI(QWidget):
                                          "Are you sure you want to close the application while a command is being executed?",
                                          QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
             if reply == QMessageBox.Yes:
+                self._proc.kill()
+                self._proc.waitForFinished()
+                self.stopDirectoryScan()
                 event.accept()
             else:
                 event.ignore()
         else:
+            self.stopDirectoryScan()
             event.accept()
 
 def main():
+    if sys.argv[1:2] == [RUN_AUDFPRINT_ARG]:
+        # Child process started by runAudfprint: no QApplication. audfprint
+        # (and numpy/scipy/h5py) is only imported here, so the GUI starts
+        # without paying for it
+        import audfprint
+        audfprint.main(sys.argv[2:], prog_name="audfprint")
+        return
+
     app = QApplication(sys.argv)
     ex = AudfprintGUI()
 
@@ -16,30 +16,50 @@ import os
 # For __main__
 import sys
 # For multiprocessing options
-import multiprocessing
-import joblib
+import collections
+import concurrent.futures
+import functools
 
-# The actual analyzer class/code
-import audfprint_analyze
-# Access to match functions, used in command line interface
-import audfprint_match
 # My hash_table implementation
 import hash_table
+# The analyzer (audfprint_analyze) and matcher (audfprint_match) modules
+# pull in scipy.signal and friends, so they are imported only where they
+# are used; commands such as list, remove and merge never load them.
 
 time_clock = time.process_time
 
+# Number of files whose hashes are collected before each bulk store
+INGEST_BATCH = 64
+# Largest number of files sent to a pool worker as one task
+MAX_CHUNKSIZE = 64
+
 
 def filename_list_iterator(filelist, wavdir, wavext, listflag):
     """ Iterator to yeild all the filenames, possibly interpreting them
         as list files, prepending wavdir """
-    if not listflag:
+    if listflag:
+        # Read each list file in one go; blank lines are skipped
+        filelist = [filename
+                    for listfilename in filelist
+                    for filename in _read_list_file(listfilename)]
+    if not wavdir:
         for filename in filelist:
-            yield os.path.join(wavdir, filename + wavext)
+            yield filename + wavext
     else:
-        for listfilename in filelist:
-            with open(listfilename, 'r') as f:
-                for filename in f:
-                    yield os.path.join(wavdir, filename.rstrip('\n') + wavext)
+        # Same result as os.path.join(wavdir, filename + wavext), without
+        # its per-call overhead; absolute names still ignore wavdir
+        prefix = os.path.join(wavdir, '')
+        for filename in filelist:
+            if os.path.isabs(filename):
+                yield filename + wavext
+            else:
+                yield prefix + filename + wavext
+
+
+def _read_list_file(listfilename):
+    """ Return the non-empty lines of a list file """
+    with open(listfilename, 'r') as f:
+        return [line for line in f.read().splitlines() if line]
 
 
 # for saving precomputed fprints
@@ -59,42 +79,88 @@ def ensure_dir(dirname):
 
 # basic operations, each in a separate function
 
-def file_precompute_peaks_or_hashes(analyzer, filename, precompdir,
-                                    precompext=None, hashes_not_peaks=True,
-                                    skip_existing=False,
-                                    strip_prefix=None):
-    """ Perform precompute action for one file, return list
-        of message strings """
+def precompute_output_name(filename, precompdir, hashes_not_peaks=True,
+                           precompext=None, strip_prefix=None):
+    """ Return the name of the file the precompute action for filename
+        writes under precompdir """
     # If strip_prefix is specified and matches the start of filename,
     # remove it from filename.
     if strip_prefix and filename[:len(strip_prefix)] == strip_prefix:
         tail_filename = filename[len(strip_prefix):]
     else:
         tail_filename = filename
-    # Form the output filename to check if it exists.
-    # strip relative directory components from file name
-    # Also remove leading absolute path (comp == '')
-    relname = '/'.join([comp for comp in tail_filename.split('/')
-                        if comp != '.' and comp != '..' and comp != ''])
+    # resolve relative directory components in file name, then remove
+    # any leading absolute path or '..' so the output stays in precompdir
+    relname = os.path.normpath(tail_filename).lstrip(os.sep)
+    while relname == os.pardir or relname.startswith(os.pardir + os.sep):
+        relname = relname[len(os.pardir):].lstrip(os.sep)
     root = os.path.splitext(relname)[0]
     if precompext is None:
+        import audfprint_analyze
         if hashes_not_peaks:
             precompext = audfprint_analyze.PRECOMPEXT
         else:
             precompext = audfprint_analyze.PRECOMPPKEXT
-    opfname = os.path.join(precompdir, root + precompext)
+    return os.path.join(precompdir, root + precompext)
+
+
+def dir_file_names(dirname):
+    """ Set of the names of the files directly in dirname (empty if it
+        cannot be read, e.g. does not exist yet) """
+    try:
+        with os.scandir(dirname or os.curdir) as entries:
+            return {entry.name for entry in entries if entry.is_file()}
+    except OSError:
+        return set()
+
+
+def skip_existing_precomputes(filenames, precompdir, type='peaks',
+                              strip_prefix=None):
+    """ Yield the filenames whose precompute output does not exist yet,
+        logging the ones skipped.  Each output directory is listed once,
+        when first needed, rather than checking each output file
+        separately. """
+    dir_names = {}
+    hashes_not_peaks = (type == 'hashes')
+    for filename in filenames:
+        opfname = precompute_output_name(filename, precompdir,
+                                         hashes_not_peaks=hashes_not_peaks,
+                                         strip_prefix=strip_prefix)
+        dirname, basename = os.path.split(opfname)
+        if dirname not in dir_names:
+            dir_names[dirname] = dir_file_names(dirname)
+        if basename in dir_names[dirname]:
+            logger.trace(["file " + opfname
+                          + " exists (and --skip-existing); skipping"])
+        else:
+            yield filename
+
+
+def file_precompute_peaks_or_hashes(analyzer, filename, precompdir,
+                                    precompext=None, hashes_not_peaks=True,
+                                    skip_existing=False,
+                                    strip_prefix=None, audio=None):
+    """ Perform precompute action for one file, return list
+        of message strings.  audio is the file's analyzer.load_audio()
+        result, if already decoded. """
+    # Form the output filename to check if it exists.
+    opfname = precompute_output_name(filename, precompdir,
+                                     hashes_not_peaks=hashes_not_peaks,
+                                     precompext=precompext,
+                                     strip_prefix=strip_prefix)
     if skip_existing and os.path.isfile(opfname):
         return ["file " + opfname + " exists (and --skip-existing); skipping"]
     else:
+        import audfprint_analyze
         # Do the analysis
         if hashes_not_peaks:
             type = "hashes"
             saver = audfprint_analyze.hashes_save
-            output = analyzer.wavfile2hashes(filename)
+            output = analyzer.wavfile2hashes(filename, audio=audio)
         else:
             type = "peaks"
             saver = audfprint_analyze.peaks_save
-            output = analyzer.wavfile2peaks(filename)
+            output = analyzer.wavfile2peaks(filename, audio=audio)
         # save the hashes or peaks file
         if len(output) == 0:
             message = "Zero length analysis for " + filename + " -- not saving."
@@ -108,78 +174,172 @@ def file_precompute_peaks_or_hashes(analyzer, filename, precompdir,
         return [message]
 
 
-def file_precompute(analyzer, filename, precompdir, type='peaks', skip_existing=False, strip_prefix=None):
+def file_precompute(analyzer, filename, precompdir, type='peaks', skip_existing=False, strip_prefix=None, audio=None):
     """ Perform precompute action for one file, return list
         of message strings """
-    logger.debug(time.ctime(), "precomputing", type, "for", filename, "...")
+    # lazy: time.ctime() only runs if the message is actually emitted
+    logger.opt(lazy=True).debug("{} precomputing {} for {} ...", time.ctime,
+                                lambda: type, lambda: filename)
     hashes_not_peaks = (type == 'hashes')
     return file_precompute_peaks_or_hashes(analyzer, filename, precompdir,
                                            hashes_not_peaks=hashes_not_peaks,
                                            skip_existing=skip_existing,
-                                           strip_prefix=strip_prefix)
-
-
-def make_ht_from_list(analyzer, filelist, hashbits, depth, maxtime, pipe=None):
-    """ Populate a hash table from a list, used as target for
-        multiprocess division.  pipe is a pipe over which to push back
-        the result, else return it """
-    # Create new ht instance
-    ht = hash_table.HashTable(hashbits=hashbits, depth=depth, maxtime=maxtime)
-    # Add in the files
-    for filename in filelist:
-        hashes = analyzer.wavfile2hashes(filename)
-        ht.store(filename, hashes)
-    # Pass back to caller
-    if pipe:
-        pipe.send(ht)
-    else:
-        return ht
+                                           strip_prefix=strip_prefix,
+                                           audio=audio)
+
+
+def prefetch_audio(analyzer, filenames, lookahead=2):
+    """ Yield (filename, audio) for each file, where audio is
+        analyzer.load_audio(filename) run on a background thread up to
+        lookahead files ahead, so decoding overlaps the analysis of the
+        previous file. """
+    with concurrent.futures.ThreadPoolExecutor(max_workers=lookahead) as executor:
+        pending = collections.deque()
+        for filename in filenames:
+            pending.append((filename,
+                            executor.submit(analyzer.load_audio, filename)))
+            if len(pending) > lookahead:
+                filename, future = pending.popleft()
+                yield filename, future.result()
+        while pending:
+            filename, future = pending.popleft()
+            yield filename, future.result()
+
+
+# State for multiprocessing pool workers.  _init_worker() installs these
+# once per worker process, so tasks only need to carry a filename.
+_worker_analyzer = None
+_worker_matcher = None
+_worker_hash_tab = None
+# For match, the hash table lives in shared memory: workers receive only
+# its header and attach to the blocks on first use.
+_worker_hash_header = None
+_worker_hash_blocks = None
+
+
+def _init_worker(analyzer, matcher, hash_header):
+    """ Pool initializer: install the shared objects in this worker """
+    global _worker_analyzer, _worker_matcher, _worker_hash_header
+    _worker_analyzer = analyzer
+    _worker_matcher = matcher
+    _worker_hash_header = hash_header
+
+
+def _get_shared_hash_tab():
+    """ Return this worker's read-only view of the shared hash table """
+    global _worker_hash_tab, _worker_hash_blocks
+    if _worker_hash_tab is None:
+        _worker_hash_tab, _worker_hash_blocks = \
+            hash_table.HashTable.from_shared(_worker_hash_header)
+    return _worker_hash_tab
+
+
+def _chunksize(nfiles, ncores):
+    """ Pool chunk size giving each worker about four chunks of files,
+        but no more than MAX_CHUNKSIZE """
+    return min(MAX_CHUNKSIZE, max(1, nfiles // (4 * ncores)))
+
+
+def _map_chunk(fn, chunk):
+    """ Run fn over one chunk of items in a pool worker """
+    return [fn(item) for item in chunk]
+
+
+def stream_map(executor, fn, items, ncores):
+    """ Like executor.map(fn, items), but only submits chunks of items
+        as earlier results are consumed, keeping at most 2 * ncores
+        chunks in flight.  Results are yielded in order as soon as they
+        are ready, and memory stays bounded however long items is. """
+    chunksize = _chunksize(len(items), ncores)
+    chunks = (items[start:start + chunksize]
+              for start in range(0, len(items), chunksize))
+    pending = collections.deque()
+    for chunk in chunks:
+        pending.append(executor.submit(_map_chunk, fn, chunk))
+        if len(pending) >= 2 * ncores:
+            yield from pending.popleft().result()
+    while pending:
+        yield from pending.popleft().result()
+
+
+def _ingest_one(filename):
+    """ Analyze one file in a pool worker; the parent stores the hashes """
+    hashes = _worker_analyzer.wavfile2hashes(filename)
+    return filename, hashes, _worker_analyzer.soundfiledur
+
+
+def _precompute_one(filename, precompdir, type, strip_prefix):
+    """ Cover for file_precompute using the pool worker's analyzer """
+    return file_precompute(_worker_analyzer, filename, precompdir, type,
+                           strip_prefix=strip_prefix)
+
+
+def trace_enabled():
+    """ True if any log sink accepts TRACE messages, so per-file loops
+        can skip building messages nobody will see """
+    return logger._core.min_level <= logger.level("TRACE").no
+
+
+def check_merge_samplerate(hash_tab, filename, params):
+    """ Raise a ValueError if the params of the table in filename don't
+        match the samplerate of hash_tab, the table being merged into """
+    if "samplerate" not in hash_tab.params:
+        # "newmerge" fails to setup the samplerate param
+        hash_tab.params["samplerate"] = params["samplerate"]
+    elif params["samplerate"] != hash_tab.params["samplerate"]:
+        raise ValueError("samplerate of " + filename + " is "
+                         + str(params["samplerate"]) + ", not "
+                         + str(hash_tab.params["samplerate"]))
 
 
 def do_cmd(cmd, analyzer, hash_tab, filename_iter, matcher, outdir, type, skip_existing=False, strip_prefix=None):
     """ Breaks out the core part of running the command.
         This is just the single-core versions.
     """
+    trace_on = trace_enabled()
     if cmd == 'merge' or cmd == 'newmerge':
         # files are other hash tables, merge them in
-        for filename in filename_iter:
+        filenames = list(filename_iter)
+        # Check the samplerates that can be read from file headers before
+        # loading any of the (large) tables
+        for filename in filenames:
+            params = hash_table.HashTable.peek_params(filename)
+            if params is not None:
+                check_merge_samplerate(hash_tab, filename, params)
+        # Formats without a header are checked as they are loaded
+        for filename in filenames:
             hash_tab2 = hash_table.HashTable(filename)
-            if "samplerate" in hash_tab.params:
-                assert hash_tab.params["samplerate"] == hash_tab2.params["samplerate"]
-            else:
-                # "newmerge" fails to setup the samplerate param
-                hash_tab.params["samplerate"] = hash_tab2.params["samplerate"]
+            check_merge_samplerate(hash_tab, filename, hash_tab2.params)
             hash_tab.merge(hash_tab2)
 
     elif cmd == 'precompute':
         # just precompute fingerprints, single core
-        for filename in filename_iter:
-            logger.trace(file_precompute(analyzer, filename, outdir, type, skip_existing=skip_existing, strip_prefix=strip_prefix))
+        if skip_existing:
+            filename_iter = skip_existing_precomputes(
+                    filename_iter, outdir, type, strip_prefix=strip_prefix)
+        for filename, audio in prefetch_audio(analyzer, filename_iter):
+            msgs = file_precompute(analyzer, filename, outdir, type, strip_prefix=strip_prefix, audio=audio)
+            if trace_on:
+                logger.trace(msgs)
 
     elif cmd == 'match':
         # Running query, single-core mode
-        for num, filename in enumerate(filename_iter):
-            msgs = matcher.file_match_to_msgs(analyzer, hash_tab, filename, num)
-            logger.trace(msgs)
+        for num, (filename, audio) in enumerate(
+                prefetch_audio(analyzer, filename_iter)):
+            msgs = matcher.file_match_to_msgs(analyzer, hash_tab, filename,
+                                              num, audio=audio)
+            if trace_on:
+                logger.trace(msgs)
 
     elif cmd == 'new' or cmd == 'add':
         # Adding files
-        tothashes = 0
-        ix = 0
-        for filename in filename_iter:
-            logger.trace([time.ctime() + " ingesting #" + str(ix) + ": "
-                    + filename + " ..."])
-            dur, nhash = analyzer.ingest(hash_tab, filename)
-            tothashes += nhash
-            ix += 1
+        tothashes = store_in_batches(
+                hash_tab, _analyze_files(analyzer, filename_iter, trace_on))
 
-        logger.trace(["Added " + str(tothashes) + " hashes "
-                + "(%.1f" % (tothashes / float(analyzer.soundfiletotaldur))
-                + " hashes/sec)"])
+        logger.trace([added_msg(tothashes, analyzer.soundfiletotaldur)])
     elif cmd == 'remove':
-        # Removing files from hash table.
-        for filename in filename_iter:
-            hash_tab.remove(filename)
+        # Removing files from hash table, all in one pass.
+        hash_tab.remove_many(list(filename_iter))
 
     elif cmd == 'list':
         hash_tab.list(lambda x: logger.trace([x]))
@@ -188,123 +348,157 @@ def do_cmd(cmd, analyzer, hash_tab, filename_iter, matcher, outdir, type, skip_e
         raise ValueError("unrecognized command: " + cmd)
 
 
-def multiproc_add(analyzer, hash_tab, filename_iter, report, ncores):
-    """Run multiple threads adding new files to hash table"""
-    # run ncores in parallel to add new files to existing HASH_TABLE
-    # lists store per-process parameters
-    # Pipes to transfer results
-    rx = [[] for _ in range(ncores)]
-    tx = [[] for _ in range(ncores)]
-    # Process objects
-    pr = [[] for _ in range(ncores)]
-    # Lists of the distinct files
-    filelists = [[] for _ in range(ncores)]
-    # unpack all the files into ncores lists
-    ix = 0
-    for filename in filename_iter:
-        filelists[ix % ncores].append(filename)
-        ix += 1
-    # Launch each of the individual processes
-    for ix in range(ncores):
-        rx[ix], tx[ix] = multiprocessing.Pipe(False)
-        pr[ix] = multiprocessing.Process(target=make_ht_from_list,
-                                         args=(analyzer, filelists[ix],
-                                               hash_tab.hashbits,
-                                               hash_tab.depth,
-                                               (1 << hash_tab.maxtimebits),
-                                               tx[ix]))
-        pr[ix].start()
-    # gather results when they all finish
-    for core in range(ncores):
-        # thread passes back serialized hash table structure
-        hash_tabx = rx[core].recv()
-        logger.trace(["hash_table " + str(core) + " has "
-                + str(len(hash_tabx.names))
-                + " files " + str(sum(hash_tabx.counts)) + " hashes"])
-        # merge in all the new items, hash entries
-        hash_tab.merge(hash_tabx)
-        # finish that thread...
-        pr[core].join()
-
-
-def matcher_file_match_to_msgs(matcher, analyzer, hash_tab, filename):
-    """Cover for matcher.file_match_to_msgs so it can be passed to joblib"""
-    return matcher.file_match_to_msgs(analyzer, hash_tab, filename)
+def added_msg(tothashes, totaldur):
+    """ Message reporting tothashes added from totaldur secs of audio;
+        the rate is 0 when no audio was read (empty or unreadable input) """
+    rate = tothashes / float(totaldur) if totaldur > 0. else 0.
+    return "Added " + str(tothashes) + " hashes (%.1f hashes/sec)" % rate
+
+
+def store_in_batches(hash_tab, named_hashes):
+    """ Store an iterable of (name, hashes) in the hash table, passing
+        INGEST_BATCH of them at a time to bulk_store.  Returns the total
+        number of hashes. """
+    tothashes = 0
+    names, hashes_list = [], []
+    for name, hashes in named_hashes:
+        names.append(name)
+        hashes_list.append(hashes)
+        tothashes += len(hashes)
+        if len(names) == INGEST_BATCH:
+            hash_tab.bulk_store(names, hashes_list)
+            names, hashes_list = [], []
+    if names:
+        hash_tab.bulk_store(names, hashes_list)
+    return tothashes
+
+
+def _analyze_files(analyzer, filenames, trace_on):
+    """ Yield (filename, hashes) for each file, analyzed in this process """
+    for ix, (filename, audio) in enumerate(
+            prefetch_audio(analyzer, filenames)):
+        if trace_on:
+            logger.trace([time.ctime() + " ingesting #" + str(ix) + ": "
+                    + filename + " ..."])
+        yield filename, analyzer.wavfile2hashes(filename, audio=audio)
 
 
-def do_cmd_multiproc(cmd, analyzer, hash_tab, filename_iter, matcher,
-                     outdir, type, report, skip_existing=False,
-                     strip_prefix=None, ncores=1):
-    """ Run the actual command, using multiple processors """
-    if cmd == 'precompute':
-        # precompute fingerprints with joblib
-        msgslist = joblib.Parallel(n_jobs=ncores)(
-                joblib.delayed(file_precompute)(analyzer, file, outdir, type, skip_existing, strip_prefix=strip_prefix)
-                for file in filename_iter
-        )
-        # Collapse into a single list of messages
-        for msgs in msgslist:
-            logger.trace(msgs)
+def multiproc_add(executor, analyzer, hash_tab, filenames, ncores):
+    """Add new files to hash table, analyzing them across the worker pool"""
+    # Workers only compute hashes; storing them all here avoids building
+    # a hash table per worker and merging them afterwards
+    def analyzed():
+        for filename, hashes, dur in stream_map(
+                executor, _ingest_one, filenames, ncores):
+            # instrumentation to track total amount of sound processed
+            analyzer.soundfiledur = dur
+            analyzer.soundfiletotaldur += dur
+            analyzer.soundfilecount += 1
+            yield filename, hashes
 
-    elif cmd == 'match':
-        # Running queries in parallel
-        msgslist = joblib.Parallel(n_jobs=ncores)(
-                # Would use matcher.file_match_to_msgs(), but you
-                # can't use joblib on an instance method
-                joblib.delayed(matcher_file_match_to_msgs)(matcher, analyzer,
-                                                           hash_tab, filename)
-                for filename in filename_iter
-        )
-        for msgs in msgslist:
-            logger.trace(msgs)
+    tothashes = store_in_batches(hash_tab, analyzed())
+    logger.trace([added_msg(tothashes, analyzer.soundfiletotaldur)])
 
-    elif cmd == 'new' or cmd == 'add':
-        # We add by forking multiple parallel threads each running
-        # analyzers over different subsets of the file list
-        multiproc_add(analyzer, hash_tab, filename_iter, report, ncores)
 
-    else:
+def matcher_file_match_to_msgs(filename):
+    """Cover for matcher.file_match_to_msgs so it can be run in the pool"""
+    return _worker_matcher.file_match_to_msgs(_worker_analyzer,
+                                              _get_shared_hash_tab(),
+                                              filename)
+
+
+def do_cmd_multiproc(cmd, analyzer, hash_tab, filename_iter, matcher,
+                     outdir, type, skip_existing=False,
+                     strip_prefix=None, ncores=1):
+    """ Run the actual command, using multiple processors """
+    if cmd not in ['precompute', 'match', 'new', 'add']:
         # This is not a multiproc command
         raise ValueError("unrecognized multiproc command: " + cmd)
 
+    if cmd == 'precompute' and skip_existing:
+        # Drop the files already done before handing work to the pool
+        filename_iter = skip_existing_precomputes(
+                filename_iter, outdir, type, strip_prefix=strip_prefix)
+    filenames = list(filename_iter)
+    trace_on = trace_enabled()
+    # For match, publish the hash table in shared memory so the workers
+    # read the one copy instead of each unpickling their own.
+    shared_blocks = hash_tab.to_shared() if cmd == 'match' else {}
+    hash_header = hash_tab.shared_header(shared_blocks) if shared_blocks \
+        else None
+    # match never changes or saves the table, so drop the parent's own
+    # arrays rather than holding the bucket array twice
+    for attr in shared_blocks:
+        setattr(hash_tab, attr, None)
+    # One pool for the whole command.  The analyzer, matcher and (for
+    # match) hash table header are handed to each worker once, at startup,
+    # rather than being pickled into every task.
+    try:
+        with concurrent.futures.ProcessPoolExecutor(
+                max_workers=ncores, initializer=_init_worker,
+                initargs=(analyzer, matcher, hash_header)) as executor:
+            if cmd == 'precompute':
+                # precompute fingerprints in parallel
+                precompute_fn = functools.partial(
+                        _precompute_one, precompdir=outdir, type=type,
+                        strip_prefix=strip_prefix)
+                for msgs in stream_map(executor, precompute_fn, filenames,
+                                       ncores):
+                    if trace_on:
+                        logger.trace(msgs)
+
+            elif cmd == 'match':
+                # Running queries in parallel
+                for msgs in stream_map(executor, matcher_file_match_to_msgs,
+                                       filenames, ncores):
+                    if trace_on:
+                        logger.trace(msgs)
+
+            elif cmd == 'new' or cmd == 'add':
+                # Analyze files across the pool, storing hashes as they arrive
+                multiproc_add(executor, analyzer, hash_tab, filenames, ncores)
+    finally:
+        for shm in shared_blocks.values():
+            shm.close()
+            shm.unlink()
+
 
 # Command to separate out setting of analyzer parameters
 def setup_analyzer(density, is_match, pks_per_frame, fanout, freq_sd, shifts, samplerate, continue_on_error):
     """Create a new analyzer object, taking values from docopts args"""
-    # Create analyzer object; parameters will get set below
-    analyzer = audfprint_analyze.Analyzer()
-    # Read parameters from command line/docopts
-    analyzer.density = float(density)
-    analyzer.maxpksperframe = int(pks_per_frame)
-    analyzer.maxpairsperpeak = int(fanout)
-    analyzer.f_sd = float(freq_sd)
-    analyzer.shifts = int(shifts)
-    # fixed - 512 pt FFT with 256 pt hop at 11025 Hz
-    analyzer.target_sr = int(samplerate)
-    analyzer.n_fft = 512
-    analyzer.n_hop = analyzer.n_fft // 2
+    import audfprint_analyze
+    shifts = int(shifts)
     # set default value for shifts depending on mode
-    if analyzer.shifts == 0:
+    if shifts == 0:
         # Default shift is 4 for match, otherwise 1
-        analyzer.shifts = 4 if is_match else 1
-    analyzer.fail_on_error = not continue_on_error
-    return analyzer
+        shifts = 4 if is_match else 1
+    # fixed - 512 pt FFT with 256 pt hop at 11025 Hz
+    n_fft = 512
+    return audfprint_analyze.Analyzer(density=float(density),
+                                      target_sr=int(samplerate),
+                                      n_fft=n_fft,
+                                      n_hop=n_fft // 2,
+                                      shifts=shifts,
+                                      f_sd=float(freq_sd),
+                                      maxpksperframe=int(pks_per_frame),
+                                      maxpairsperpeak=int(fanout),
+                                      fail_on_error=not continue_on_error)
 
 
 def setup_matcher(match_win, search_depth, min_count, max_matches, exact_count, find_time_range, time_quantile, sortbytime, illustrate, illustrate_hpf):
     """Create a new matcher objects, set parameters from docopt structure"""
-    matcher = audfprint_match.Matcher()
-    matcher.window = int(match_win)
-    matcher.threshcount = int(min_count)
-    matcher.max_returns = int(max_matches)
-    matcher.search_depth = int(search_depth)
-    matcher.sort_by_time = sortbytime
-    matcher.exact_count = exact_count | illustrate | illustrate_hpf
-    matcher.illustrate = illustrate | illustrate_hpf
-    matcher.illustrate_hpf = illustrate_hpf
-    matcher.find_time_range = find_time_range
-    matcher.time_quantile = float(time_quantile)
-    return matcher
+    import audfprint_match
+    return audfprint_match.Matcher(
+            window=int(match_win),
+            threshcount=int(min_count),
+            max_returns=int(max_matches),
+            search_depth=int(search_depth),
+            sort_by_time=sortbytime,
+            exact_count=exact_count | illustrate | illustrate_hpf,
+            illustrate=illustrate | illustrate_hpf,
+            illustrate_hpf=illustrate_hpf,
+            find_time_range=find_time_range,
+            time_quantile=float(time_quantile))
 
 
 __version__ = 20150406
@@ -383,7 +577,8 @@ def main(cmd, dbase, density, hashbits, bucketsize, maxtime, maxtimebits, sample
 
         else:
             logger.trace([time.ctime() + " Reading hash table " + dbase])
-            hash_tab = hash_table.HashTable(dbase)
+            # "list" only needs the names, so skip reading the table
+            hash_tab = hash_table.HashTable(dbase, load_table=(cmd != "list"))
             if analyzer and 'samplerate' in hash_tab.params \
                     and hash_tab.params['samplerate'] != analyzer.target_sr:
                 logger.debug("db samplerate overridden to ", analyzer.target_sr)
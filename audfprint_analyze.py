@@ -9,6 +9,7 @@ Class to do the analysis of wave files into hash constellations.
 
 from loguru import logger
 
+import functools
 import os
 import numpy as np
 
@@ -78,6 +79,14 @@ DF_SHIFT = DT_BITS
 DT_MASK = (1 << DT_BITS) - 1
 
 
+@functools.lru_cache(maxsize=None)
+def _analysis_window(n_fft):
+    """ Hann window for the STFT, computed once per FFT size """
+    window = np.hanning(n_fft + 2)[1:-1]
+    window.flags.writeable = False
+    return window
+
+
 def landmarks2hashes(landmarks):
     """Convert a list of (time, bin1, bin2, dtime) landmarks
     into a list of (time, hash) pairs where the hash combines
@@ -122,18 +131,20 @@ class Analyzer(object):
     __sp_len = None
     __sp_vals = []
 
-    def __init__(self, density=DENSITY):
+    def __init__(self, density=DENSITY, target_sr=11025, n_fft=N_FFT,
+                 n_hop=N_HOP, shifts=1, f_sd=30.0, maxpksperframe=5,
+                 maxpairsperpeak=3, fail_on_error=True):
         self.density = density
-        self.target_sr = 11025
-        self.n_fft = N_FFT
-        self.n_hop = N_HOP
-        self.shifts = 1
+        self.target_sr = target_sr
+        self.n_fft = n_fft
+        self.n_hop = n_hop
+        self.shifts = shifts
         # how wide to spreak peaks
-        self.f_sd = 30.0
+        self.f_sd = f_sd
         # Maximum number of local maxima to keep per frame
-        self.maxpksperframe = 5
+        self.maxpksperframe = maxpksperframe
         # Limit the num of pairs we'll make from each peak (Fanout)
-        self.maxpairsperpeak = 3
+        self.maxpairsperpeak = maxpairsperpeak
         # Values controlling peaks2landmarks
         # +/- 31 bins in freq (LIMITED TO -32..31 IN LANDMARK2HASH)
         self.targetdf = 31
@@ -148,7 +159,7 @@ class Analyzer(object):
         # .. and count of files
         self.soundfilecount = 0
         # Control behavior on file reading error
-        self.fail_on_error = True
+        self.fail_on_error = fail_on_error
 
     def spreadpeaksinvector(self, vector, width=4.0):
         """ Create a blurred version of vector, where each of the local maxes
@@ -276,7 +287,7 @@ class Analyzer(object):
         # masking envelope decay constant
         a_dec = (1 - 0.01 * (self.density * np.sqrt(self.n_hop / 352.8) / 35)) ** (1 / OVERSAMP)
         # Take spectrogram
-        mywin = np.hanning(self.n_fft + 2)[1:-1]
+        mywin = _analysis_window(self.n_fft)
         sgram = np.abs(stft.stft(d, n_fft=self.n_fft,
                                  hop_length=self.n_hop,
                                  window=mywin))
@@ -288,11 +299,11 @@ class Analyzer(object):
             # The sgram is identically zero, i.e., the input signal was identically
             # zero.  Not good, but let's let it through for now.
             logger.debug("find_peaks: Warning: input signal is identically zero.")
-        # High-pass filter onset emphasis
+        # High-pass filter onset emphasis, all rows in one call along time
         # [:-1,] discards top bin (nyquist) of sgram so bins fit in 8 bits
-        sgram = np.array([scipy.signal.lfilter([1, -1],
-                                               [1, -HPF_POLE ** (1 / OVERSAMP)], s_row)
-                          for s_row in sgram])[:-1, ]
+        sgram = scipy.signal.lfilter([1, -1],
+                                     [1, -HPF_POLE ** (1 / OVERSAMP)],
+                                     sgram, axis=1)[:-1, ]
         # Prune to keep only local maxima in spectrum that appear above an online,
         # decaying threshold
         peaks = self._decaying_threshold_fwd_prune(sgram, a_dec)
@@ -342,28 +353,47 @@ class Analyzer(object):
 
         return landmarks
 
-    def wavfile2peaks(self, filename, shifts=None):
+    def load_audio(self, filename):
+        """ Decode a soundfile to mono samples at target_sr, returning
+            (d, sr), or None for a precomputed fingerprint file.  Safe to
+            call from another thread, so decoding can run ahead of
+            analysis; pass the result to wavfile2peaks/wavfile2hashes
+            as audio, where None means they read the file themselves. """
+        if os.path.splitext(filename)[1] in (PRECOMPEXT, PRECOMPPKEXT):
+            return None
+        return self._decode_audio(filename)
+
+    def _decode_audio(self, filename):
+        """ Decode a soundfile to (d, sr); read errors give empty audio
+            unless fail_on_error is set """
+        try:
+            # [d, sr] = librosa.load(filename, sr=self.target_sr)
+            d, sr = audio_read.audio_read(filename, sr=self.target_sr, channels=1)
+        except Exception as e:  # audioread.NoBackendError:
+            message = "wavfile2peaks: Error reading " + filename
+            if self.fail_on_error:
+                logger.exception(e)
+                raise IOError(message)
+            logger.debug(message, "skipping")
+            d = []
+            sr = self.target_sr
+        return d, sr
+
+    def wavfile2peaks(self, filename, shifts=None, audio=None):
         """ Read a soundfile and return its landmark peaks as a
             list of (time, bin) pairs.  If specified, resample to sr first.
             shifts > 1 causes hashes to be extracted from multiple shifts of
-            waveform, to reduce frame effects.  """
+            waveform, to reduce frame effects.  audio is the result of
+            load_audio(filename), if already decoded. """
         ext = os.path.splitext(filename)[1]
         if ext == PRECOMPPKEXT:
             # short-circuit - precomputed fingerprint file
             peaks = peaks_load(filename)
             dur = np.max(peaks, axis=0)[0] * self.n_hop / self.target_sr
         else:
-            try:
-                # [d, sr] = librosa.load(filename, sr=self.target_sr)
-                d, sr = audio_read.audio_read(filename, sr=self.target_sr, channels=1)
-            except Exception as e:  # audioread.NoBackendError:
-                message = "wavfile2peaks: Error reading " + filename
-                if self.fail_on_error:
-                    logger.exception(e)
-                    raise IOError(message)
-                logger.debug(message, "skipping")
-                d = []
-                sr = self.target_sr
+            if audio is None:
+                audio = self._decode_audio(filename)
+            d, sr = audio
             # Store duration in a global because it's hard to handle
             dur = len(d) / sr
             if shifts is None or shifts < 2:
@@ -382,11 +412,12 @@ class Analyzer(object):
         self.soundfilecount += 1
         return peaks
 
-    def wavfile2hashes(self, filename):
+    def wavfile2hashes(self, filename, audio=None):
         """ Read a soundfile and return its fingerprint hashes as a
             list of (time, hash) pairs.  If specified, resample to sr first.
             shifts > 1 causes hashes to be extracted from multiple shifts of
-            waveform, to reduce frame effects.  """
+            waveform, to reduce frame effects.  audio is the result of
+            load_audio(filename), if already decoded.  """
         ext = os.path.splitext(filename)[1]
         if ext == PRECOMPEXT:
             # short-circuit - precomputed fingerprint file
@@ -397,7 +428,7 @@ class Analyzer(object):
             self.soundfiletotaldur += dur
             self.soundfilecount += 1
         else:
-            peaks = self.wavfile2peaks(filename, self.shifts)
+            peaks = self.wavfile2peaks(filename, self.shifts, audio=audio)
             if len(peaks) == 0:
                 return []
             # Did we get returned a list of lists of peaks due to shift?
@@ -569,7 +600,8 @@ def glob2hashtable(pattern, density=20.0):
     totdur = 0.0
     tothashes = 0
     for ix, file_ in enumerate(filelist):
-        logger.debug(time.ctime(), "ingesting #", ix, ":", file_, "...")
+        logger.opt(lazy=True).debug("{} ingesting #{}: {} ...", time.ctime,
+                                    lambda: ix, lambda: file_)
         dur, nhash = g2h_analyzer.ingest(ht, file_)
         totdur += dur
         tothashes += nhash
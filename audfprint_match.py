@@ -94,28 +94,31 @@ def find_modes(data, threshold=5, window=0):
 class Matcher(object):
     """Provide matching for audfprint fingerprint queries to hash table"""
 
-    def __init__(self):
-        """Set up default object values"""
+    def __init__(self, window=1, threshcount=5, max_returns=1,
+                 search_depth=100, sort_by_time=False, illustrate=False,
+                 exact_count=False, find_time_range=False,
+                 time_quantile=0.02, illustrate_hpf=False):
+        """Set up object values, defaulting any not given"""
         # Tolerance window for time differences
-        self.window = 1
+        self.window = window
         # Absolute minimum number of matching hashes to count as a match
-        self.threshcount = 5
+        self.threshcount = threshcount
         # How many hits to return?
-        self.max_returns = 1
+        self.max_returns = max_returns
         # How deep to search in return list?
-        self.search_depth = 100
+        self.search_depth = search_depth
         # Sort those returns by time (instead of counts)?
-        self.sort_by_time = False
+        self.sort_by_time = sort_by_time
         # Do illustration?
-        self.illustrate = False
+        self.illustrate = illustrate
         # Careful counts?
-        self.exact_count = False
+        self.exact_count = exact_count
         # Search for time range?
-        self.find_time_range = False
+        self.find_time_range = find_time_range
         # Quantile of time range to report.
-        self.time_quantile = 0.02
+        self.time_quantile = time_quantile
         # Display pre-emphasized spectrogram in illustrate_match?
-        self.illustrate_hpf = False
+        self.illustrate_hpf = illustrate_hpf
         # If there are a lot of matches within a single track at different
         # alignments, stop looking after a while.
         self.max_alignments_per_id = 100
@@ -350,13 +353,14 @@ class Matcher(object):
             hashesforhashes = self._unique_match_hashes(id, hits, mode)
             return results, hashesforhashes
 
-    def match_file(self, analyzer, ht, filename, number=None):
+    def match_file(self, analyzer, ht, filename, number=None, audio=None):
         """ Read in an audio file, calculate its landmarks, query against
             hash table.  Return top N matches as (id, filterdmatchcount,
             timeoffs, rawmatchcount), also length of input file in sec,
-            and count of raw query hashes extracted
+            and count of raw query hashes extracted.  audio is the
+            file's analyzer.load_audio() result, if already decoded.
         """
-        q_hashes = analyzer.wavfile2hashes(filename)
+        q_hashes = analyzer.wavfile2hashes(filename, audio=audio)
         # Fake durations as largest hash time
         if len(q_hashes) == 0:
             durd = 0.0
@@ -367,9 +371,11 @@ class Matcher(object):
             numberstring = "#%d" % number
         else:
             numberstring = ""
-        logger.trace(time.ctime(), "Analyzed", numberstring, filename, "of",
-              ('%.3f' % durd), "s "
-                               "to", len(q_hashes), "hashes")
+        # lazy: time.ctime() only runs if the message is actually emitted
+        logger.opt(lazy=True).trace(
+            "{} Analyzed {} {} of {:.3f} s to {} hashes", time.ctime,
+            lambda: numberstring, lambda: filename, lambda: durd,
+            lambda: len(q_hashes))
 
         # Run query
         rslts = self.match_hashes(ht, q_hashes)
@@ -378,12 +384,13 @@ class Matcher(object):
             rslts = rslts[(-rslts[:, 2]).argsort(), :]
         return rslts[:self.max_returns, :], durd, len(q_hashes)
 
-    def file_match_to_msgs(self, analyzer, ht, qry, number=None):
+    def file_match_to_msgs(self, analyzer, ht, qry, number=None, audio=None):
         """ Perform a match on a single input file, return list
             of message strings """
         current_log_level = logger._core.min_level
 
-        rslts, dur, nhash = self.match_file(analyzer, ht, qry, number)
+        rslts, dur, nhash = self.match_file(analyzer, ht, qry, number,
+                                            audio=audio)
         t_hop = analyzer.n_hop / analyzer.target_sr
         if current_log_level < 5: # if current level is TRACE or more
             qrymsg = f"{qry} {dur:.1f} sec {nhash} raw hashes"
@@ -74,43 +74,22 @@ def audio_read_ffmpeg(filename, sr=None, channels=None):
     offset = 0.0
     duration = None
     dtype = np.float32
-    y = []
     with FFmpegAudioFile(os.path.realpath(filename),
-                         sample_rate=sr, channels=channels) as input_file:
+                         sample_rate=sr, channels=channels,
+                         block_size=65536) as input_file:
         sr = input_file.sample_rate
         channels = input_file.channels
-        s_start = int(np.floor(sr * offset) * channels)
-        if duration is None:
-            s_end = np.inf
-        else:
-            s_end = s_start + int(np.ceil(sr * duration) * channels)
-        num_read = 0
-        for frame in input_file:
-            frame = buf_to_float(frame, dtype=dtype)
-            num_read_prev = num_read
-            num_read += len(frame)
-            if num_read < s_start:
-                # offset is after the current frame, keep reading.
-                continue
-            if s_end < num_read_prev:
-                # we're off the end.  stop reading
-                break
-            if s_end < num_read:
-                # the end is in this frame.  crop.
-                frame = frame[:s_end - num_read_prev]
-            if num_read_prev <= s_start < num_read:
-                # beginning is in this frame
-                frame = frame[(s_start - num_read_prev):]
-            # tack on the current frame
-            y.append(frame)
-
-        if not len(y):
-            # Zero-length read
-            y = np.zeros(0, dtype=dtype)
-        else:
-            y = np.concatenate(y)
-            if channels > 1:
-                y = y.reshape((-1, 2)).T
+        # Collect the raw PCM and convert it to float in one go, rather
+        # than converting and concatenating each block separately.
+        y = buf_to_float(b''.join(input_file), dtype=dtype)
+    s_start = int(np.floor(sr * offset) * channels)
+    if duration is None:
+        s_end = len(y)
+    else:
+        s_end = s_start + int(np.ceil(sr * duration) * channels)
+    y = y[s_start:s_end]
+    if channels > 1:
+        y = y.reshape((-1, 2)).T
 
     # Final cleanup for dtype and contiguity
     y = np.ascontiguousarray(y, dtype=dtype)
@@ -19,6 +19,7 @@ import json
 import h5py
 import random
 import sys
+from multiprocessing import shared_memory
 
 import numpy as np
 import scipy.io
@@ -49,6 +50,13 @@ def _bitsfor(maxval):
     return maxvalbits
 
 
+# Array fields that to_shared() publishes in shared memory
+SHARED_ARRAYS = ("table", "counts", "hashesperid")
+# Scalar fields carried alongside them in the shared header
+SHARED_FIELDS = ("hashbits", "depth", "maxtimebits", "names", "params",
+                 "ht_version")
+
+
 class HashTable(object):
     """
     Simple hash table for storing and retrieving fingerprint hashes.
@@ -60,10 +68,14 @@ class HashTable(object):
     """
     __slots__ = ("hashbits", "depth", "maxtimebits", "table" , "counts", "names", "hashesperid", "params", "ht_version", "dirty")
 
-    def __init__(self, filename=None, hashbits=20, depth=100, maxtime=16384):
-        """ allocate an empty hash table of the specified size """
+    def __init__(self, filename=None, hashbits=20, depth=100, maxtime=16384,
+                 load_table=True):
+        """ allocate an empty hash table of the specified size,
+            or read one from filename.  load_table=False skips reading
+            the (large) bucket array from HDF files, for callers that only
+            need the names and counts. """
         if filename is not None:
-            self.load(filename)
+            self.load(filename, load_table=load_table)
         else:
             self.hashbits = hashbits
             self.depth = depth
@@ -141,6 +153,49 @@ class HashTable(object):
         # Mark as unsaved
         self.dirty = True
 
+    def bulk_store(self, names, hashes_list):
+        """ Store several lists of (time, hash) pairs at once, one list
+            per name, as one vectorized pass over the hashes sorted by
+            bucket.  Gives the same table as calling store() for each
+            name in turn for non-overflowing buckets; overflow
+            replacement draws from np.random rather than random, so it
+            is statistically equivalent but not identical.
+        """
+        ids = [self.name_to_id(name, add_if_missing=True) for name in names]
+        lengths = [len(hashes) for hashes in hashes_list]
+        self.dirty = True
+        if sum(lengths) == 0:
+            return
+        pairs = np.concatenate([np.asarray(hashes, dtype=np.int64).reshape(-1, 2)
+                                for hashes in hashes_list])
+        hashmask = (1 << self.hashbits) - 1
+        timemask = (1 << self.maxtimebits) - 1
+        # The id value is based on (id_ + 1) to avoid an all-zero value.
+        idvals = (np.repeat(np.array(ids, dtype=np.int64), lengths) + 1) \
+            << self.maxtimebits
+        vals = (idvals + (pairs[:, 0] & timemask)).astype(np.uint32)
+        hashes = pairs[:, 1] & hashmask
+        # Stable sort keeps each bucket's inserts in their original order
+        order = np.argsort(hashes, kind='stable')
+        hashes = hashes[order]
+        vals = vals[order]
+        # How many vals each insert finds already in its bucket
+        starts = np.flatnonzero(np.r_[True, hashes[1:] != hashes[:-1]])
+        sizes = np.diff(np.r_[starts, len(hashes)])
+        counts = (self.counts[hashes].astype(np.int64)
+                  + np.arange(len(hashes)) - np.repeat(starts, sizes))
+        # Full buckets overwrite a random slot, or drop the val if the
+        # slot falls beyond the end
+        slots = counts.copy()
+        full = counts >= self.depth
+        slots[full] = np.random.randint(0, counts[full] + 1)
+        keep = slots < self.depth
+        self.table[hashes[keep], slots[keep]] = vals[keep]
+        # Update record of number of vals in each bucket
+        self.counts[hashes[starts]] += sizes.astype(self.counts.dtype)
+        # Record how many hashes we (attempted to) save for each id
+        np.add.at(self.hashesperid, ids, lengths)
+
     def get_entry(self, hash_):
         """ Return np.array of [id, time] entries
             associate with the given hash as rows.
@@ -179,6 +234,48 @@ class HashTable(object):
         hits.resize((nhits, 4), refcheck=False)
         return hits
 
+    def to_shared(self):
+        """ Copy the table arrays into shared memory blocks.
+            Returns a dict mapping each array field to its SharedMemory
+            block; the caller must close() and unlink() them when done. """
+        blocks = {}
+        for attr in SHARED_ARRAYS:
+            arr = getattr(self, attr)
+            shm = shared_memory.SharedMemory(create=True,
+                                             size=max(1, arr.nbytes))
+            np.ndarray(arr.shape, arr.dtype, buffer=shm.buf)[...] = arr
+            blocks[attr] = shm
+        return blocks
+
+    def shared_header(self, blocks):
+        """ Picklable description of a table published by to_shared():
+            the scalar fields plus (name, shape, dtype) for each block """
+        header = {attr: getattr(self, attr) for attr in SHARED_FIELDS
+                  if hasattr(self, attr)}
+        header["arrays"] = {attr: (shm.name, getattr(self, attr).shape,
+                                   getattr(self, attr).dtype.str)
+                            for attr, shm in blocks.items()}
+        return header
+
+    @classmethod
+    def from_shared(cls, header):
+        """ Rebuild a read-only table on the blocks described by header.
+            Returns (table, blocks); the blocks must be kept alive for as
+            long as the table is in use. """
+        ht = cls.__new__(cls)
+        for attr, value in header.items():
+            if attr != "arrays":
+                setattr(ht, attr, value)
+        blocks = []
+        for attr, (shm_name, shape, dtype) in header["arrays"].items():
+            shm = shared_memory.SharedMemory(name=shm_name)
+            arr = np.ndarray(shape, dtype, buffer=shm.buf)
+            arr.flags.writeable = False
+            setattr(ht, attr, arr)
+            blocks.append(shm)
+        ht.dirty = False
+        return ht, blocks
+
     def save(self, name, params=None, file_object=None, save_type=None):
         if not save_type:
             save_type = DatabaseType.HDF
@@ -248,7 +345,7 @@ class HashTable(object):
         
         # temp.close()
 
-    def load(self, name):
+    def load(self, name, load_table=True):
         """ Read either pklz or mat-format hash table file """
         logger.trace(f"Loading hash table from {name}")
 
@@ -257,20 +354,34 @@ class HashTable(object):
         if ext == '.mat':
             self.load_matlab(name)
         elif ext == '.hdf':
-            self.load_hdf(name)
+            self.load_hdf(name, load_table=load_table)
         elif ext == '.pkl':
             self.load_pkl(name)
         else:
             logger.debug("Hash table file type is not specified. Loading as HDF")
-            self.load_hdf(name)
+            self.load_hdf(name, load_table=load_table)
 
         nhashes = sum(self.counts)
         # Report the proportion of dropped hashes (overfull table)
         dropped = nhashes - sum(np.minimum(self.depth, self.counts))
         logger.debug(f"Read fprints for {sum(n is not None for n in self.names)} files ({nhashes} hashes) from {name} ({100.0 * dropped / max(1, nhashes):.2f}% dropped)")
 
-    def load_hdf(self, name, file_object=None):
-        """ Read hash table values from pickle file <name>. """
+    @staticmethod
+    def peek_params(name):
+        """ Return the params dict of the hash table saved in file <name>,
+            reading only the HDF header attributes.  Returns None for
+            pickle and Matlab files, which have no separate header and
+            can only be checked once loaded. """
+        ext = os.path.splitext(name)[1]
+        if ext in ('.mat', '.pkl'):
+            return None
+        with h5py.File(name, 'r') as temp:
+            return json.loads(temp.attrs['params'])
+
+    def load_hdf(self, name, file_object=None, load_table=True):
+        """ Read hash table values from HDF file <name>.
+            The table is gzip-compressed on disk, so it cannot be memory
+            mapped; with load_table=False it is not read at all. """
         if file_object:
             f = file_object
         else:
@@ -294,13 +405,14 @@ class HashTable(object):
             raise ValueError("'maxtimebits' not found!")
             # self.maxtimebits = _bitsfor(temp.maxtime)
 
-        self.table = temp['table'][:]
+        self.table = temp['table'][:] if load_table else None
         
         self.counts = temp['counts'][:]
         self.names = list(temp['names'].asstr())
         self.hashesperid = np.array(temp['hashesperid'][...]).astype(np.uint32)
         self.dirty = False
         self.params = json.loads(temp.attrs['params'])
+        temp.close()
 
         # self.ht_version = temp.ht_version
 
@@ -439,23 +551,47 @@ class HashTable(object):
 
     def remove(self, name):
         """ Remove all data for named entity from the hash table. """
-        id_ = self.name_to_id(name)
+        self.remove_many([name])
+
+    def remove_many(self, names):
+        """ Remove all data for several named entities from the hash
+            table, in a single sweep over the table. """
+        name_ids = {}
+        for id_, name in enumerate(self.names):
+            if name is not None:
+                name_ids.setdefault(name, id_)
+        ids = []
+        for name in names:
+            if isinstance(name, basestring):
+                if name not in name_ids:
+                    raise ValueError("name " + name + " not found")
+                ids.append(name_ids[name])
+            else:
+                # we were passed in a numerical id
+                ids.append(name)
+        ids = np.array(ids, dtype=np.int64)
         # Top nybbles of table entries are id_ + 1 (to avoid all-zero entries)
-        id_in_table = (self.table >> self.maxtimebits) == id_ + 1
-        hashes_removed = 0
-        for hash_ in np.nonzero(np.max(id_in_table, axis=1))[0]:
-            vals = self.table[hash_, :self.counts[hash_]]
-            vals = [v for v, x in zip(vals, id_in_table[hash_])
-                    if not x]
-            self.table[hash_] = np.hstack([vals,
-                                           np.zeros(self.depth - len(vals))])
+        id_in_table = np.isin(self.table >> self.maxtimebits, ids + 1)
+        rows = np.flatnonzero(np.any(id_in_table, axis=1))
+        hashes_removed = int(np.sum(id_in_table[rows]))
+        if len(rows):
+            # Keep the surviving stored vals of each affected bucket, packed
+            # to the front in their original order.
+            filled = (np.arange(self.depth)
+                      < np.minimum(self.depth, self.counts[rows])[:, np.newaxis])
+            keep = filled & ~id_in_table[rows]
+            order = np.argsort(~keep, axis=1, kind='stable')
+            vals = np.take_along_axis(self.table[rows], order, axis=1)
+            nkeep = np.sum(keep, axis=1)
+            vals[np.arange(self.depth) >= nkeep[:, np.newaxis]] = 0
+            self.table[rows] = vals
             # This will forget how many extra hashes we had dropped until now.
-            self.counts[hash_] = len(vals)
-            hashes_removed += np.sum(id_in_table[hash_])
-        self.names[id_] = None
-        self.hashesperid[id_] = 0
+            self.counts[rows] = nkeep
+        for id_ in ids:
+            self.names[id_] = None
+            self.hashesperid[id_] = 0
         self.dirty = True
-        logger.debug("Removed", name, "(", hashes_removed, "hashes).")
+        logger.debug(f"Removed {len(ids)} files ({hashes_removed} hashes).")
 
     def retrieve(self, name):
         """Return an np.array of (time, hash) pairs found in the table."""